@@ -2,8 +2,23 @@ from logging import Logger
 from typing import Optional
 
 from awesome_object_store.base import BaseObjectStore
+from awesome_object_store.buffered_writer import BufferedWriter
 from awesome_object_store.gcs import GoogleCloudStore
+from awesome_object_store.listing_index import ListingIndex
 from awesome_object_store.minio import MinioStore
+from awesome_object_store.rate_limit import (
+    RateLimiter,
+    get_rate_limiters,
+    remove_rate_limit,
+    set_rate_limit,
+)
+from awesome_object_store.tiered import (
+    WRITE_BACK,
+    WRITE_THROUGH,
+    TieredObjectStore,
+    TierPolicy,
+)
+from awesome_object_store.utils import ChecksumMismatchError
 
 
 def init_object_store(
@@ -15,9 +30,11 @@ def init_object_store(
     region: str = None,
     logger: Optional[Logger] = None,
     protocol: Optional[str] = "gcs",
+    mmap_threshold: Optional[int] = None,
+    verify_checksum: bool = False,
 ) -> BaseObjectStore:
     if protocol == "gcs":
-        return GoogleCloudStore(bucket, logger)
+        return GoogleCloudStore(bucket, logger, mmap_threshold, verify_checksum)
     else:
         return MinioStore(
             bucket,
@@ -27,4 +44,5 @@ def init_object_store(
             secure,
             region,
             logger,
+            verify_checksum,
         )
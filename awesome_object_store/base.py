@@ -1,20 +1,184 @@
 import csv
-import json
+import glob
+import hashlib
+import os
+import sys
+import tempfile
 from abc import ABC, abstractmethod
-from io import BytesIO, StringIO
-from logging import Logger
-from typing import IO, Generic, List, Optional, TypeVar
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BufferedReader, BytesIO, RawIOBase
+from itertools import chain
+from logging import Logger, getLogger
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import quote, unquote
 
 import pandas as pd
 from starlette.datastructures import UploadFile
 
+from awesome_object_store.listing_index import ListingIndex
+from awesome_object_store.rate_limit import get_rate_limiters
+from awesome_object_store.utils import (
+    IterStream,
+    compact_df,
+    compact_dtypes,
+    json_dumps,
+    json_loads,
+)
+
 BlobType = TypeVar("BlobType")
 BucketType = TypeVar("BucketType")
 
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+DEFAULT_CSV_CHUNK_SIZE = 64 * 1024 * 1024
+NEWLINE_SCAN_SIZE = 64 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+CAS_PREFIX = ".cas/sha256/"
+LIST_PAGE_SIZE = 1000
+SCHEMA_SUFFIX = ".schema.json"
+CHECKSUM_RETRIES = 2
+
+
+def _partition_value(value: Any) -> Optional[str]:
+    # integral floats, e.g. from an int column holding NaN, are written as ints
+    if pd.isna(value):
+        return None
+    if pd.api.types.is_float(value) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _partition_path(partition_cols: List[str], values: tuple) -> str:
+    parts = []
+    for col, value in zip(partition_cols, values):
+        encoded = _partition_value(value)
+        if encoded is None:
+            encoded = HIVE_DEFAULT_PARTITION
+        else:
+            encoded = quote(encoded, safe="")
+        parts.append(f"{col}={encoded}")
+    return "/".join(parts)
+
+
+def _parse_partitions(root: str, name: str) -> Dict[str, Optional[str]]:
+    partitions: Dict[str, Optional[str]] = {}
+    for segment in name[len(root) :].split("/")[:-1]:
+        if "=" not in segment:
+            continue
+        col, value = segment.split("=", 1)
+        partitions[col] = None if value == HIVE_DEFAULT_PARTITION else unquote(value)
+    return partitions
+
+
+def _result_size(result: Any) -> int:
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    return sys.getsizeof(result)
+
+
+_worker_store: Optional["BaseObjectStore"] = None
+
+
+def _init_worker(store: "BaseObjectStore") -> None:
+    global _worker_store
+    _worker_store = store
+
+
+def _call_worker(func: Callable[["BaseObjectStore", str], Any], name: str) -> Any:
+    return func(_worker_store, name)  # type: ignore
+
+
+def _parse_csv_range(
+    name: str, header: bytes, start: int, end: int, read_csv_kwargs: dict
+) -> pd.DataFrame:
+    body = _worker_store.get_range(name, start, end - start)  # type: ignore
+    return pd.read_csv(BytesIO(header + body), **read_csv_kwargs)
+
+
+def _mixed_columns(frames: List[pd.DataFrame], skip: Iterable[str]) -> List[str]:
+    """Columns whose inferred dtypes disagree across frames beyond int/float."""
+    mixed = []
+    for col in frames[0].columns:
+        if col in skip:
+            continue
+        dtypes = {frame[col].dtype for frame in frames}
+        numeric = all(
+            pd.api.types.is_numeric_dtype(dtype)
+            and not pd.api.types.is_bool_dtype(dtype)
+            for dtype in dtypes
+        )
+        if len(dtypes) > 1 and not numeric:
+            mixed.append(col)
+    return mixed
+
 
 class BaseObjectStore(Generic[BucketType, BlobType], ABC):
     bucket: str
+    endpoint: str
     logger: Logger
+    listing_index: Optional[ListingIndex] = None
+    cas_prefix: str = CAS_PREFIX
+    _client: Any = None
+    _client_pid: Optional[int] = None
+
+    def __getstate__(self) -> dict:
+        """Pickle the store without its client, which is rebuilt lazily."""
+        state = self.__dict__.copy()
+        state.pop("_client", None)
+        state.pop("_client_pid", None)
+        logger = state.get("logger")
+        if logger is not None and getLogger(logger.name) is not logger:
+            # loggers that are not registered, like the default Logger("minio"),
+            # refuse to pickle, so they are rebuilt from their name
+            state["logger"] = logger.name
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if isinstance(self.__dict__.get("logger"), str):
+            self.logger = Logger(self.logger)  # type: ignore
+
+    def _walk_files(
+        self, name: str, file_path: str, exclude_files: List[str] = []
+    ) -> Iterator[Tuple[str, str]]:
+        """Yields the (object name, local file) pairs fput uploads."""
+        if not os.path.isdir(file_path):
+            yield name, file_path
+            return
+        for local_file in glob.glob(file_path + "/**"):
+            file_name = Path(local_file).name
+            if file_name in exclude_files:
+                self.logger.info(f"exclude: {local_file}")
+                continue
+            if os.path.isfile(local_file):
+                yield os.path.join(name, local_file[1 + len(file_path) :]), local_file
+            else:
+                yield from self._walk_files(
+                    os.path.join(name, file_name), local_file, exclude_files
+                )
+
+    def _client_stale(self) -> bool:
+        """Whether the client must be (re)built, e.g. after a fork."""
+        return self._client is None or self._client_pid != os.getpid()
 
     @abstractmethod
     def create_bucket(self, bucket_name: str) -> None:
@@ -35,7 +199,7 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
         recursive: bool = False,
         start_offset: Optional[str] = None,
         end_offset: Optional[str] = None,
-    ) -> List[BlobType]:
+    ) -> List[str]:
         pass
 
     @abstractmethod
@@ -46,16 +210,36 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
     def put(
         self,
         name: str,
-        data: IO,
+        data: Union[IO, RawIOBase],
         length: Optional[int] = None,
         content_type: str = "application/octet-stream",
     ) -> None:
         pass
 
+    @abstractmethod
+    def copy_object(self, source: str, name: str) -> None:
+        pass
+
     @abstractmethod
     def get(self, name: str) -> BlobType:
         pass
 
+    @abstractmethod
+    def get_stream(self, name: str) -> ContextManager[IO[bytes]]:
+        pass
+
+    @abstractmethod
+    def get_size(self, name: str) -> int:
+        pass
+
+    @abstractmethod
+    def get_etag(self, name: str) -> str:
+        pass
+
+    @abstractmethod
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        pass
+
     @abstractmethod
     def exists(self, name: str) -> bool:
         pass
@@ -74,6 +258,9 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
         name: str,
         column_types: dict = {},
         date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+        compact: bool = False,
     ) -> Optional[pd.DataFrame]:
         pass
 
@@ -81,6 +268,80 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
     def get_json(self, name: str) -> dict:
         pass
 
+    def _throttle(self, requests: int = 1, nbytes: int = 0) -> None:
+        """Wait for the rate limits configured for this endpoint and bucket."""
+        for limiter in get_rate_limiters(self.endpoint, self.bucket):
+            limiter.acquire(requests, nbytes)
+
+    def _throttle_bytes(self, nbytes: int) -> None:
+        self._throttle(0, nbytes)
+
+    def _cached_list_objects(
+        self,
+        prefix: Optional[str],
+        recursive: bool,
+        start_offset: Optional[str],
+        end_offset: Optional[str],
+    ) -> Optional[List[str]]:
+        if self.listing_index is None:
+            return None
+        return self.listing_index.query(prefix, recursive, start_offset, end_offset)
+
+    def _index_listing(
+        self,
+        prefix: Optional[str],
+        recursive: bool,
+        start_offset: Optional[str],
+        end_offset: Optional[str],
+        objects: List[str],
+    ) -> None:
+        if self.listing_index is None or not recursive:
+            return
+        if start_offset is None and end_offset is None:
+            self.listing_index.load(prefix or "", objects)
+
+    def _index_add(self, name: str) -> None:
+        if self.listing_index is not None:
+            self.listing_index.add(name)
+
+    def _index_remove(self, name: str) -> None:
+        if self.listing_index is not None:
+            self.listing_index.remove(name)
+
+    def list_objects_parallel(
+        self,
+        prefix: Optional[str] = None,
+        boundaries: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[str]:
+        """Lists all objects under prefix recursively, sharding the keyspace.
+
+        With boundaries, the keyspace is split into the lexicographic ranges
+        between consecutive boundaries and each range is listed with
+        start_offset/end_offset. Otherwise each delimited sub-prefix of prefix
+        is listed as its own shard. Shards are listed concurrently.
+        """
+        shards: List[Tuple[Optional[str], Optional[str], Optional[str]]]
+        if boundaries:
+            bounds: List[Optional[str]] = [None, *sorted(boundaries), None]
+            objects: List[str] = []
+            shards = [(prefix, start, end) for start, end in zip(bounds, bounds[1:])]
+        else:
+            top = self.list_objects(prefix, recursive=False)
+            objects = [name for name in top if not name.endswith("/")]
+            shards = [(name, None, None) for name in top if name.endswith("/")]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = executor.map(
+                lambda shard: self.list_objects(
+                    shard[0], True, start_offset=shard[1], end_offset=shard[2]
+                ),
+                shards,
+            )
+            objects = sorted(set(chain(objects, *listings)))
+        self._index_listing(prefix, True, None, None, objects)
+        return objects
+
     def remove_dir(self, folder: str) -> None:
         """Remove folder."""
         self.logger.warning("removing %s", folder)
@@ -89,21 +350,432 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
         self.remove_objects(objects_to_delete)
 
     def upload_df(
-        self, name: str, data: pd.DataFrame, index=False, quoting=csv.QUOTE_MINIMAL
+        self,
+        name: str,
+        data: pd.DataFrame,
+        index=False,
+        quoting=csv.QUOTE_MINIMAL,
+        schema: bool = False,
     ) -> None:
-        """Uploads data from a pandas dataframe to an object in a bucket."""
+        """Uploads data from a pandas dataframe to an object in a bucket.
+
+        With schema, the compact dtypes of the columns and the etag of the
+        csv are also written to the name + SCHEMA_SUFFIX object, for
+        get_df(name, compact=True).
+        """
         data_bytes = data.to_csv(index=index, quoting=quoting).encode("utf-8")
         data_byte_stream = BytesIO(data_bytes)
 
         self.put(name, data_byte_stream, content_type="application/csv")
+        if schema:
+            self.put_as_json(
+                name + SCHEMA_SUFFIX,
+                {"etag": self.get_etag(name), "dtypes": compact_dtypes(data)},
+            )
+
+    def _df_reader(
+        self,
+        name: str,
+        column_types: dict = {},
+        date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+        compact: bool = False,
+    ) -> Callable[[IO], pd.DataFrame]:
+        """Returns a function parsing a csv file object the way get_df does.
+
+        A compact reader takes the dtypes from the schema of the object, so
+        pandas skips inferring them, and compacts the columns it lacks. A
+        schema recorded for another version of the csv, with another etag, is
+        ignored.
+        """
+        if compact:
+            schema = self.get_json(name + SCHEMA_SUFFIX)
+            if schema and schema.get("etag") == self.get_etag(name):
+                skip = set(date_columns) | set(converters or {})
+                dtypes = {k: v for k, v in schema["dtypes"].items() if k not in skip}
+                column_types = {**dtypes, **column_types}
+            elif schema:
+                self.logger.warning("ignoring outdated schema of %s", name)
+        read_csv_kwargs: dict = {
+            "dtype": column_types,
+            "usecols": usecols,
+            "converters": converters,
+        }
+        if date_columns:
+            read_csv_kwargs["parse_dates"] = date_columns
+
+        def read_csv(file_obj: IO) -> pd.DataFrame:
+            df = pd.read_csv(file_obj, **read_csv_kwargs)
+            if compact:
+                df = compact_df(df, exclude=set(column_types) | set(date_columns))
+            return df
+
+        return read_csv
+
+    def write_dataset(
+        self,
+        prefix: str,
+        data: pd.DataFrame,
+        partition_cols: List[str],
+        index=False,
+        quoting=csv.QUOTE_MINIMAL,
+        max_workers: Optional[int] = None,
+    ) -> List[str]:
+        """Uploads a dataframe as a hive-style partitioned dataset.
+
+        One csv object is written per distinct combination of partition_cols,
+        under ``{prefix}/{col}={value}/.../part-0.csv``, and the partition
+        columns are dropped from the stored csv, so data needs other columns
+        too. Unused categories of a categorical column get no object. Returns
+        the written keys.
+        """
+        if not partition_cols:
+            raise ValueError("partition_cols must not be empty")
+        if not index and data.columns.difference(partition_cols).empty:
+            raise ValueError("data must have columns besides partition_cols")
+        root = prefix.rstrip("/")
+        tasks: List[Tuple[str, pd.DataFrame]] = []
+        # categoricals are grouped by value, so unused categories get no group
+        # and missing values get one
+        columns = [
+            data[col].astype(object)
+            if isinstance(data[col].dtype, pd.CategoricalDtype)
+            else data[col]
+            for col in partition_cols
+        ]
+        keys = columns[0] if len(columns) == 1 else columns
+        for values, group in data.groupby(keys, sort=False, dropna=False):
+            if not isinstance(values, tuple):
+                values = (values,)
+            name = f"{root}/{_partition_path(partition_cols, values)}/part-0.csv"
+            tasks.append((name, group.drop(columns=partition_cols)))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.upload_df, name, group, index, quoting)
+                for name, group in tasks
+            ]
+            for future in futures:
+                future.result()
+        return [name for name, _ in tasks]
+
+    def read_dataset(
+        self,
+        prefix: str,
+        filters: Optional[dict] = None,
+        column_types: dict = {},
+        date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Reads a hive-style partitioned dataset written by write_dataset.
+
+        filters maps a partition column to an allowed value or a list of
+        allowed values. Partitions are pruned from the key names alone, so
+        only matching objects are downloaded. Partition columns are appended
+        to the resulting dataframe as strings unless typed by column_types.
+        """
+        root = prefix.rstrip("/") + "/"
+        allowed = {}
+        for col, values in (filters or {}).items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            allowed[col] = {_partition_value(v) for v in values}
+
+        selected = []
+        for name in self.list_objects(prefix=root, recursive=True):
+            partitions = _parse_partitions(root, name)
+            if all(
+                col in partitions and partitions[col] in values
+                for col, values in allowed.items()
+            ):
+                selected.append((name, partitions))
+        if not selected:
+            return None
+
+        partition_names = set().union(*(partitions for _, partitions in selected))
+        data_usecols = (
+            None
+            if usecols is None
+            else [col for col in usecols if col not in partition_names]
+        )
+        # read_csv with empty usecols returns no rows, so read all the columns
+        # and drop them to keep the row count
+        partitions_only = data_usecols == []
+        if partitions_only:
+            data_usecols = None
+
+        def load(name: str) -> Optional[pd.DataFrame]:
+            return self.get_df(
+                name,
+                column_types={
+                    k: v for k, v in column_types.items() if k not in partition_names
+                },
+                date_columns=[c for c in date_columns if c not in partition_names],
+                usecols=data_usecols,
+                converters=converters,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(load, [name for name, _ in selected]))
+
+        results = []
+        for df, (_, partitions) in zip(frames, selected):
+            if df is None:
+                continue
+            if partitions_only:
+                df = df.iloc[:, :0]
+            for col, value in partitions.items():
+                if usecols is None or col in usecols:
+                    df[col] = value
+            results.append(df)
+        if not results:
+            return None
+        df = pd.concat(results, ignore_index=True)
+        for col in partition_names:
+            if col in df.columns and col in column_types:
+                df[col] = df[col].astype(column_types[col])
+        return df
+
+    def _next_line_start(self, name: str, offset: int, size: int) -> int:
+        """Return the offset right after the first newline at or after offset."""
+        while offset < size:
+            window = self.get_range(name, offset, min(NEWLINE_SCAN_SIZE, size - offset))
+            index = window.find(b"\n")
+            if index >= 0:
+                return offset + index + 1
+            offset += len(window)
+        return size
+
+    def get_df_parallel(
+        self,
+        name: str,
+        column_types: dict = {},
+        date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CSV_CHUNK_SIZE,
+    ) -> Optional[pd.DataFrame]:
+        """Gets a dataframe from a large csv object using all cores.
+
+        The object is split into newline aligned byte ranges of about
+        chunk_size, each fetched with a range request and parsed by a worker
+        of a process pool, so the parent never holds the raw bytes. Objects
+        smaller than chunk_size are read with get_df. Quoted fields must not
+        contain newlines, and the store and converters must be picklable.
+        """
+        try:
+            size = self.get_size(name)
+        except Exception as e:
+            self.logger.warning(e)
+            return None
+        if size <= chunk_size:
+            return self.get_df(name, column_types, date_columns, usecols, converters)
+
+        read_csv_kwargs: dict = {
+            "dtype": column_types,
+            "usecols": usecols,
+            "converters": converters,
+        }
+        if date_columns:
+            read_csv_kwargs["parse_dates"] = date_columns
+        max_workers = max_workers or os.cpu_count()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as io_executor:
+            header_end = self._next_line_start(name, 0, size)
+            starts = io_executor.map(
+                lambda offset: self._next_line_start(name, offset - 1, size),
+                range(header_end + chunk_size, size, chunk_size),
+            )
+            boundaries = sorted({header_end, *starts, size})
+        header = self.get_range(name, 0, header_end)
+        if header_end >= size:
+            return pd.read_csv(BytesIO(header), **read_csv_kwargs)
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(self,)
+        ) as cpu_executor:
+            futures = [
+                cpu_executor.submit(
+                    _parse_csv_range, name, header, start, end, read_csv_kwargs
+                )
+                for start, end in zip(boundaries[:-1], boundaries[1:])
+            ]
+            frames = [future.result() for future in futures]
+
+            # a column read as e.g. ints in one chunk and strings in another is
+            # read as strings everywhere, like get_df infers it from all rows
+            mixed = _mixed_columns(frames, {*column_types, *(converters or {})})
+            reparsed = {}
+            for i, frame in enumerate(frames):
+                columns = [
+                    col
+                    for col in mixed
+                    if frame[col].dtype != object and frame[col].notna().any()
+                ]
+                if not columns:
+                    continue
+                kwargs = dict(
+                    read_csv_kwargs,
+                    dtype={**column_types, **dict.fromkeys(columns, str)},
+                )
+                if date_columns:
+                    kwargs["parse_dates"] = [
+                        col for col in date_columns if col not in columns
+                    ]
+                reparsed[i] = cpu_executor.submit(
+                    _parse_csv_range,
+                    name,
+                    header,
+                    boundaries[i],
+                    boundaries[i + 1],
+                    kwargs,
+                )
+            for i, future in reparsed.items():
+                frames[i] = future.result()
+
+        df = pd.concat(frames, ignore_index=True)
+        for col, dtype in column_types.items():
+            if col in df.columns and str(dtype) == "category":
+                df[col] = df[col].astype("category")
+        return df
+
+    def _load_bytes(self, name: str) -> bytes:
+        with self.get_stream(name) as stream:
+            return stream.read()
+
+    def prefetch_iter(
+        self,
+        names: Iterable[str],
+        depth: int = 4,
+        loader: Optional[Callable[[str], Any]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Yields loader(name) for each name in order, loading ahead in threads.
+
+        Up to depth objects are downloaded and parsed while the caller works
+        on the current one. loader defaults to reading the raw bytes and can
+        be e.g. get_df or get_json. With max_bytes, no new load starts while
+        the loaded but not yet consumed results are larger than max_bytes.
+        """
+        loader = loader if loader is not None else self._load_bytes
+        remaining = iter(names)
+        pending: Deque[Future] = deque()
+        sizes: Dict[Future, int] = {}
+
+        def buffered_bytes() -> int:
+            for future in pending:
+                if future not in sizes and future.done() and not future.exception():
+                    sizes[future] = _result_size(future.result())
+            return sum(sizes.values())
+
+        def fill() -> None:
+            while len(pending) < depth:
+                if max_bytes is not None and pending and buffered_bytes() >= max_bytes:
+                    return
+                name = next(remaining, None)
+                if name is None:
+                    return
+                pending.append(executor.submit(loader, name))
+
+        executor = ThreadPoolExecutor(max_workers=depth)
+        try:
+            fill()
+            while pending:
+                future = pending.popleft()
+                result = future.result()
+                sizes.pop(future, None)
+                fill()
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def process_map(
+        self,
+        func: Callable[["BaseObjectStore", str], Any],
+        names: Iterable[str],
+        max_workers: Optional[int] = None,
+        chunksize: int = 1,
+    ) -> List[Any]:
+        """Returns func(store, name) for each name, computed in a process pool.
+
+        The store is pickled once per worker process, which then builds and
+        reuses its own client. func must be picklable, e.g. a module level
+        function or an unbound method like MinioStore.get_df.
+        """
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            return list(
+                executor.map(partial(_call_worker, func), names, chunksize=chunksize)
+            )
 
     def put_as_json(self, name: str, data: dict) -> None:
         """Uploads data from a json to an object in a bucket."""
-        data_bytes = json.dumps(data).encode("utf-8")
+        data_bytes = json_dumps(data)
         data_byte_stream = BytesIO(data_bytes)
 
         self.put(name, data_byte_stream, content_type="application/json")
 
+    def put_deduplicated(
+        self,
+        name: str,
+        data: IO,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """Uploads data once under its sha256 and copies it server side to name.
+
+        The stream is hashed while it is spooled to a temporary file, and the
+        upload is skipped when the content key already exists. Returns the
+        content key.
+        """
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=DEFAULT_PART_SIZE) as spool:
+            for chunk in iter(lambda: data.read(DEFAULT_PART_SIZE), b""):
+                digest.update(chunk)
+                spool.write(chunk)
+            key = self.cas_prefix + digest.hexdigest()
+            if self.exists(key):
+                self.logger.info("%s already uploaded as %s", name, key)
+            else:
+                length = spool.tell()
+                spool.seek(0)
+                self.put(key, spool, length=length, content_type=content_type)
+        self.copy_object(key, name)
+        return key
+
+    def fput_deduplicated(
+        self, name: str, file_path: str, exclude_files: List[str] = []
+    ) -> List[str]:
+        """Uploads a file/folder like fput, storing each file once by sha256.
+
+        Each file is read once, hashed while it is spooled like in
+        put_deduplicated. Returns the content keys of the files referenced
+        under name.
+        """
+        keys = []
+        for remote_path, local_file in self._walk_files(name, file_path, exclude_files):
+            with open(local_file, "rb") as f:
+                keys.append(self.put_deduplicated(remote_path, f))
+        return keys
+
+    def put_ndjson(self, name: str, records: Iterable[Any]) -> None:
+        """Uploads records as newline delimited json, streaming in parts."""
+        stream = IterStream(json_dumps(record) + b"\n" for record in records)
+        self.put(name, stream, length=-1, content_type="application/x-ndjson")
+
+    def iter_ndjson(self, name: str) -> Iterator[Any]:
+        """Yields records of a newline delimited json object, streaming the body."""
+        with self.get_stream(name) as stream:
+            for line in BufferedReader(stream, DEFAULT_PART_SIZE):  # type: ignore
+                if line.strip():
+                    yield json_loads(line)
+
     def fget_df(
         self,
         file: UploadFile,
@@ -113,20 +785,45 @@ class BaseObjectStore(Generic[BucketType, BlobType], ABC):
         converters: Optional[dict] = None,
     ) -> Optional[pd.DataFrame]:
         try:
-            file_io = StringIO(str(file.file.read(), "utf-8"))
             df = pd.read_csv(
-                file_io,
+                file.file,
+                encoding="utf-8",
                 dtype=column_types,
                 parse_dates=date_columns,
                 usecols=usecols,
                 converters=converters,
             )
-            file_io.close()
         except Exception as e:
             self.logger.warning("unable to read csv %s" % str(e))
             return None
         return df
 
+    def fget_df_chunks(
+        self,
+        file: UploadFile,
+        chunksize: int,
+        column_types: dict = {},
+        date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yields dataframes of chunksize rows parsed incrementally from file."""
+        with pd.read_csv(
+            file.file,
+            encoding="utf-8",
+            dtype=column_types,
+            parse_dates=date_columns,
+            usecols=usecols,
+            converters=converters,
+            chunksize=chunksize,
+        ) as reader:
+            yield from reader
+
+    def put_upload_file(self, name: str, file: UploadFile) -> None:
+        """Uploads an UploadFile to an object in parts, without buffering it."""
+        content_type = file.content_type or "application/octet-stream"
+        self.put(name, file.file, length=-1, content_type=content_type)
+
     def remove_objects(self, names: list) -> None:
         """Remove objects."""
         for name in names:
@@ -0,0 +1,183 @@
+import atexit
+import queue
+import threading
+import time
+import uuid
+from io import BytesIO
+from typing import Any, List, Optional
+
+from awesome_object_store.base import BaseObjectStore
+from awesome_object_store.utils import json_dumps
+
+_CLOSE = object()
+
+
+class BufferedWriter:
+    """Batches many small records into newline delimited json objects.
+
+    Records passed to write are queued and a background thread uploads them
+    to ``{prefix}{timestamp}-{uuid}.ndjson`` once max_records or max_bytes is
+    buffered, or max_interval seconds after the first buffered record. write
+    blocks while queue_size records are waiting, and close flushes whatever
+    is left, also at interpreter exit. A batch that fails to upload is kept
+    and retried after max_interval, or right away on flush and close. Until
+    it is uploaded no more records are taken from the queue, and write,
+    flush and close raise the error.
+    """
+
+    def __init__(
+        self,
+        store: BaseObjectStore,
+        prefix: str,
+        max_records: int = 1000,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_interval: float = 5.0,
+        queue_size: int = 10000,
+    ):
+        self.store = store
+        self.prefix = prefix
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._attempts = 0
+        self._attempted = threading.Condition()
+        self._retry = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, record: Any, timeout: Optional[float] = None) -> None:
+        """Queue a record, waiting up to timeout seconds while the queue is full."""
+        if self._closed:
+            raise ValueError("write to closed BufferedWriter")
+        self._raise_error()
+        self._queue.put(json_dumps(record) + b"\n", timeout=timeout)
+
+    def flush(self) -> None:
+        """Upload all records queued so far and wait until it is done."""
+        if self._closed:
+            return
+        if self._error is not None:
+            self._retry_now()
+        done = threading.Event()
+        while True:
+            self._raise_error()
+            try:
+                self._queue.put(done, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        # an upload failing before done is reached holds the rest of the queue
+        with self._attempted:
+            self._attempted.wait_for(lambda: done.is_set() or self._error is not None)
+        self._raise_error()
+
+    def close(self) -> None:
+        """Flush the remaining records and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._error is not None:
+            self._retry_now()
+        # the thread stops by itself when the retry failed, or when a later
+        # upload fails while it drains the queue
+        while self._error is None and self._thread.is_alive():
+            try:
+                self._queue.put(_CLOSE, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+        atexit.unregister(self.close)
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        error = self._error
+        if error is not None:
+            raise error
+
+    def _retry_now(self) -> None:
+        """Retry the failed batch without waiting and wait for the attempt."""
+        with self._attempted:
+            attempts = self._attempts
+            self._retry.set()
+            self._attempted.wait_for(
+                lambda: self._attempts > attempts or not self._thread.is_alive()
+            )
+
+    def _upload(self, lines: List[bytes], size: int) -> bool:
+        if not lines:
+            return True
+        timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = f"{self.prefix}{timestamp}-{uuid.uuid4().hex}.ndjson"
+        error: Optional[Exception] = None
+        try:
+            self.store.put(
+                name,
+                BytesIO(b"".join(lines)),
+                length=size,
+                content_type="application/x-ndjson",
+            )
+        except Exception as e:
+            self.store.logger.warning(
+                "unable to flush %d records to %s: %s", len(lines), name, e
+            )
+            error = e
+        with self._attempted:
+            self._error = error
+            self._attempts += 1
+            self._attempted.notify_all()
+        return error is None
+
+    def _run(self) -> None:
+        lines: List[bytes] = []
+        size = 0
+        deadline: Optional[float] = None
+        while True:
+            if self._error is not None:
+                # hold the failed batch and leave new records in the queue,
+                # so write blocks on it, until the batch is uploaded
+                self._retry.wait(max(0, (deadline or 0) - time.monotonic()))
+                self._retry.clear()
+                if self._upload(lines, size):
+                    lines = []
+                    size = 0
+                    deadline = None
+                elif self._closed:
+                    return
+                else:
+                    deadline = time.monotonic() + self.max_interval
+                continue
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, bytes):
+                lines.append(item)
+                size += len(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_interval
+                if len(lines) < self.max_records and size < self.max_bytes:
+                    continue
+            if self._upload(lines, size):
+                lines = []
+                size = 0
+                deadline = None
+            else:
+                deadline = time.monotonic() + self.max_interval
+            if isinstance(item, threading.Event):
+                with self._attempted:
+                    item.set()
+                    self._attempted.notify_all()
+            elif item is _CLOSE:
+                return
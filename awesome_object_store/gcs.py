@@ -1,28 +1,40 @@
-import glob
-import json
-from io import BytesIO
+import mmap
+import os
+import tempfile
+from io import SEEK_END, BytesIO, RawIOBase
 from logging import Logger
 from os import path
-from pathlib import Path
-from typing import IO, List, Optional
+from typing import IO, Callable, List, Optional, TypeVar, Union
 
 import pandas as pd
 from google.api_core.exceptions import NotFound
 from google.cloud.storage import Blob, Bucket, Client
+from google.resumable_media import DataCorruption
 
-from awesome_object_store.base import BaseObjectStore
+from awesome_object_store.base import (
+    CHECKSUM_RETRIES,
+    DEFAULT_PART_SIZE,
+    LIST_PAGE_SIZE,
+    BaseObjectStore,
+)
+from awesome_object_store.rate_limit import ThrottledStream
+from awesome_object_store.utils import MmapReader, json_loads
 
+T = TypeVar("T")
 
-class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
-    client: Client
 
+class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
     def __init__(
         self,
         bucket: str,
         logger: Optional[Logger] = None,
+        mmap_threshold: Optional[int] = None,
+        verify_checksum: bool = False,
     ):
         self.bucket = bucket
-        self.client = Client()
+        self.endpoint = "storage.googleapis.com"
+        self.mmap_threshold = mmap_threshold
+        self.verify_checksum = verify_checksum
         self.logger = logger if logger is not None else Logger("minio")
         found = self.client.bucket(self.bucket).exists()
         if not found:
@@ -31,14 +43,25 @@ class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
         else:
             self.logger.info("bucket '%s' exists", self.bucket)
 
+    @property
+    def client(self) -> Client:
+        """The client of the current process, created on first use."""
+        if self._client_stale():
+            self._client = Client()
+            self._client_pid = os.getpid()
+        return self._client
+
     def create_bucket(self, bucket_name: str):
+        self._throttle()
         self.client.create_bucket(bucket_name)
 
     def bucket_exists(self, bucket_name: str) -> bool:
+        self._throttle()
         return self.client.bucket(bucket_name).exists()
 
     def list_buckets(self):
         """List information of all accessible buckets with text."""
+        self._throttle()
         return [x.name for x in self.client.list_buckets()]
 
     def list_objects(
@@ -49,6 +72,9 @@ class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
         end_offset: Optional[str] = None,
     ):
         """Lists object information of a bucket with text."""
+        cached = self._cached_list_objects(prefix, recursive, start_offset, end_offset)
+        if cached is not None:
+            return cached
         delimiter = None if recursive else "/"
         blobs = self.client.list_blobs(
             self.bucket,
@@ -58,58 +84,162 @@ class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
             end_offset=end_offset,
         )
         objects = []
-        for blob in blobs:
+        for index, blob in enumerate(blobs):
+            if index % LIST_PAGE_SIZE == 0:
+                self._throttle()
             objects.append(blob.name)
 
         if delimiter:
-            for prefix in blobs.prefixes:
-                objects.append(prefix)
+            for blob_prefix in blobs.prefixes:
+                objects.append(blob_prefix)
 
+        self._index_listing(prefix, recursive, start_offset, end_offset, objects)
         return objects
 
     def fput(self, name: str, file_path: str, exclude_files: List[str] = []):
         """Uploads data from a file/folder to an object in a bucket."""
-        if path.isdir(file_path):
-            for local_file in glob.glob(file_path + "/**"):
-                file_name = Path(local_file).name
-                remote_path = path.join(name, file_name)
-
-                if file_name in exclude_files:
-                    self.logger.info(f"exclude: {local_file}")
-                    continue
-
-                if not path.isfile(local_file):
-                    self.fput(remote_path, local_file, exclude_files)
-                else:
-                    remote_path = path.join(name, local_file[1 + len(file_path) :])
-                    blob: Blob = self.client.bucket(self.bucket).blob(remote_path)
-                    blob.upload_from_filename(local_file)
-        else:
-            blob = self.client.bucket(self.bucket).blob(name)
-            blob.upload_from_filename(file_path)
+        for remote_path, local_file in self._walk_files(name, file_path, exclude_files):
+            blob: Blob = self.client.bucket(self.bucket).blob(remote_path)
+            self._throttle(nbytes=path.getsize(local_file))
+            self._transfer(
+                remote_path,
+                lambda: blob.upload_from_filename(
+                    local_file, checksum=self._upload_checksum
+                ),
+            )
+            self._index_add(remote_path)
 
     def put(
         self,
         name: str,
-        data: IO,
+        data: Union[IO, RawIOBase],
         length: Optional[int] = None,
         content_type: str = "application/octet-stream",
     ):
-        """Uploads data from a stream to an object in a bucket."""
+        """Uploads data from a stream to an object in a bucket.
+
+        A length of -1 uploads a stream of unknown size in resumable chunks.
+        """
         if not length:
+            # the size is charged to the rate limits without reading the data
+            length = data.seek(0, SEEK_END)
             data.seek(0)
 
-        blob: Blob = self.client.bucket(self.bucket).blob(name)
-        blob.upload_from_file(data)
+        if length == -1:
+            chunk_size = DEFAULT_PART_SIZE
+            self._throttle()
+            data = ThrottledStream(data, self._throttle_bytes)
+        else:
+            chunk_size = None
+            self._throttle(nbytes=length)
+        blob: Blob = self.client.bucket(self.bucket).blob(name, chunk_size=chunk_size)
+        start = data.tell() if data.seekable() else None
+
+        def upload():
+            if start is not None:
+                data.seek(start)
+            blob.upload_from_file(
+                data, content_type=content_type, checksum=self._upload_checksum
+            )
+
+        self._transfer(name, upload, retry=start is not None)
+        self._index_add(name)
+
+    @property
+    def _upload_checksum(self) -> Optional[str]:
+        return "crc32c" if self.verify_checksum else None
+
+    @property
+    def _download_checksum(self) -> str:
+        return "crc32c" if self.verify_checksum else "md5"
+
+    def _transfer(self, name: str, transfer: Callable[[], T], retry: bool = True) -> T:
+        """Run transfer, retrying it when verify_checksum is set and it fails."""
+        for attempt in range(CHECKSUM_RETRIES):
+            try:
+                return transfer()
+            except DataCorruption as e:
+                if not (self.verify_checksum and retry):
+                    raise
+                self.logger.warning("checksum mismatch for %s, retrying: %s", name, e)
+        return transfer()
+
+    def _download_to_file(self, blob: Blob, file_obj: IO) -> None:
+        file_obj.seek(0)
+        file_obj.truncate()
+        blob.download_to_file(file_obj, checksum=self._download_checksum)
+
+    def copy_object(self, source: str, name: str):
+        """Copies an object server side."""
+        self._throttle()
+        bucket = self.client.bucket(self.bucket)
+        bucket.copy_blob(bucket.blob(source), bucket, name)
+        self._index_add(name)
 
     def get(self, name: str):
-        """Gets data of an object."""
+        """Gets data of an object.
+
+        When mmap_threshold is set, objects larger than it are downloaded to a
+        temporary file and returned as a memory-mapped MmapReader, so their
+        content is kept in the page cache instead of the Python heap.
+        """
+        self._throttle()
+        if self.mmap_threshold is None:
+            blob = self.client.bucket(self.bucket).blob(name)
+        else:
+            blob = self.client.bucket(self.bucket).get_blob(name)
+            if blob is None:
+                raise NotFound(f"{name} not found")
+            if blob.size > self.mmap_threshold:
+                with tempfile.TemporaryFile() as temp_file:
+                    self._transfer(
+                        name, lambda: self._download_to_file(blob, temp_file)
+                    )
+                    temp_file.flush()
+                    buffer = mmap.mmap(temp_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._throttle_bytes(len(buffer))
+                return MmapReader(buffer)
+
         file_obj = BytesIO()
-        blob = self.client.bucket(self.bucket).blob(name)
-        blob.download_to_file(file_obj)
+        self._transfer(name, lambda: self._download_to_file(blob, file_obj))
+        self._throttle_bytes(file_obj.tell())
         file_obj.seek(0)
         return file_obj
 
+    def get_stream(self, name: str) -> IO[bytes]:
+        """Gets data of an object as a stream, downloading it in chunks.
+
+        With verify_checksum, the object is downloaded and verified by get.
+        """
+        if self.verify_checksum:
+            return self.get(name)
+        self._throttle()
+        blob = self.client.bucket(self.bucket).blob(name)
+        reader = blob.open("rb", chunk_size=DEFAULT_PART_SIZE)
+        return ThrottledStream(reader, self._throttle_bytes)  # type: ignore
+
+    def get_size(self, name: str) -> int:
+        """Gets the size of an object in bytes."""
+        self._throttle()
+        blob = self.client.bucket(self.bucket).get_blob(name)
+        if blob is None:
+            raise NotFound(f"{name} not found")
+        return blob.size
+
+    def get_etag(self, name: str) -> str:
+        """Gets the etag of an object, which changes whenever it is rewritten."""
+        self._throttle()
+        blob = self.client.bucket(self.bucket).get_blob(name)
+        if blob is None:
+            raise NotFound(f"{name} not found")
+        return blob.etag
+
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        """Gets length bytes of an object starting at offset."""
+        self._throttle(nbytes=length)
+        blob = self.client.bucket(self.bucket).blob(name)
+        return blob.download_as_bytes(start=offset, end=offset + length - 1)
+
     def get_json(self, name: str) -> dict:
         """Gets data of an object and return a json."""
         try:
@@ -117,7 +247,12 @@ class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
         except NotFound as e:
             self.logger.warning(e)
             return {}
-        result = json.load(file_obj)
+        buffer = file_obj.getbuffer()
+        try:
+            result = json_loads(buffer)
+        finally:
+            buffer.release()
+            file_obj.close()
         return result
 
     def get_df(
@@ -127,38 +262,42 @@ class GoogleCloudStore(BaseObjectStore[Bucket, Blob]):
         date_columns: List[str] = [],
         usecols: Optional[List] = None,
         converters: Optional[dict] = None,
+        compact: bool = False,
     ) -> Optional[pd.DataFrame]:
         """Gets data of an object and return a dataframe."""
         try:
+            read_csv = self._df_reader(
+                name, column_types, date_columns, usecols, converters, compact
+            )
             file_obj = self.get(name)
         except NotFound as e:
             self.logger.warning(e)
             return None
-        if not date_columns:
-            df = pd.read_csv(
-                file_obj, dtype=column_types, usecols=usecols, converters=converters
-            )
-        else:
-            df = pd.read_csv(
-                file_obj,
-                parse_dates=date_columns,
-                dtype=column_types,
-                usecols=usecols,
-                converters=converters,
-            )
+        df = read_csv(file_obj)
+        file_obj.close()
         return df
 
     def exists(self, name: str) -> bool:
         """Check if object or bucket exist."""
+        self._throttle()
         blob: Blob = self.client.bucket(self.bucket).get_blob(name)
         return False if blob is None else True
 
     def remove_object(self, name: str):
         """Remove an object."""
+        self._throttle()
         blob: Blob = self.client.bucket(self.bucket).blob(name)
         blob.delete()
+        self._index_remove(name)
 
     def download(self, name: str, file_path: str):
         """Downloads data of an object to file."""
+        self._throttle()
         blob: Blob = self.client.bucket(self.bucket).blob(name)
-        blob.download_to_filename(file_path)
+        self._transfer(
+            name,
+            lambda: blob.download_to_filename(
+                file_path, checksum=self._download_checksum
+            ),
+        )
+        self._throttle_bytes(path.getsize(file_path))
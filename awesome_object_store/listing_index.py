@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+
+class ListingIndex:
+    """A sorted in-memory snapshot of object keys per prefix.
+
+    Snapshots are loaded from recursive listings, kept up to date with writes
+    made through the owning store, and answer list_objects queries with binary
+    search until they are older than ttl seconds. When path is given the
+    snapshots are persisted there as json when a prefix is loaded or
+    invalidated and on save(); keys recorded by add and remove are only kept
+    in memory until then. An unreadable file is treated as empty.
+    """
+
+    def __init__(self, ttl: Optional[float] = 300, path: Optional[str] = None):
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._snapshots: Dict[str, Tuple[float, List[str]]] = {}
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    for prefix, snapshot in json.load(f).items():
+                        self._snapshots[prefix] = (
+                            snapshot["loaded_at"],
+                            sorted(snapshot["keys"]),
+                        )
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                self._snapshots.clear()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["_save_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return self.ttl is None or time.time() - loaded_at < self.ttl
+
+    def _covering(self, prefix: str) -> Optional[List[str]]:
+        """Return the keys of the longest fresh snapshot covering prefix."""
+        best = None
+        for snapshot_prefix, (loaded_at, keys) in self._snapshots.items():
+            if not prefix.startswith(snapshot_prefix) or not self._is_fresh(loaded_at):
+                continue
+            if best is None or len(snapshot_prefix) > len(best[0]):
+                best = (snapshot_prefix, keys)
+        return None if best is None else best[1]
+
+    def load(self, prefix: str, keys: List[str]) -> None:
+        """Replace the snapshot of prefix with a complete recursive listing."""
+        with self._lock:
+            self._snapshots[prefix] = (time.time(), sorted(keys))
+        self.save()
+
+    def save(self) -> None:
+        """Atomically persist all snapshots to path, if any."""
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                snapshots = {
+                    prefix: {"loaded_at": loaded_at, "keys": list(keys)}
+                    for prefix, (loaded_at, keys) in self._snapshots.items()
+                }
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshots, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        """Drop the snapshot of prefix, or all snapshots."""
+        with self._lock:
+            if prefix is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(prefix, None)
+        self.save()
+
+    def add(self, name: str) -> None:
+        """Record a key written through the store."""
+        with self._lock:
+            for prefix, (_, keys) in self._snapshots.items():
+                if name.startswith(prefix):
+                    index = bisect_left(keys, name)
+                    if index == len(keys) or keys[index] != name:
+                        insort(keys, name)
+
+    def remove(self, name: str) -> None:
+        """Record a key removed through the store."""
+        with self._lock:
+            for _, keys in self._snapshots.values():
+                index = bisect_left(keys, name)
+                if index < len(keys) and keys[index] == name:
+                    del keys[index]
+
+    def query(
+        self,
+        prefix: Optional[str] = None,
+        recursive: bool = False,
+        start_offset: Optional[str] = None,
+        end_offset: Optional[str] = None,
+    ) -> Optional[List[str]]:
+        """List keys like list_objects, or None if no fresh snapshot covers prefix."""
+        prefix = prefix or ""
+        with self._lock:
+            keys = self._covering(prefix)
+            if keys is None:
+                return None
+            lower = max(prefix, start_offset or "")
+            upper = len(keys) if end_offset is None else bisect_left(keys, end_offset)
+            objects: List[str] = []
+            for index in range(bisect_left(keys, lower), upper):
+                key = keys[index]
+                if not key.startswith(prefix):
+                    break
+                separator = -1 if recursive else key.find("/", len(prefix))
+                if separator >= 0:
+                    key = key[: separator + 1]
+                    if objects and objects[-1] == key:
+                        continue
+                objects.append(key)
+            return objects
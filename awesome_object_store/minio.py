@@ -1,21 +1,37 @@
-import glob
-import json
+import os
+import shutil
+from contextlib import contextmanager
+from io import RawIOBase
 from logging import Logger
 from os import path
-from pathlib import Path
-from typing import IO, List, Optional
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
 
 import pandas as pd
 from minio import Minio, S3Error
+from minio.commonconfig import CopySource
 from minio.datatypes import Bucket
+from minio.helpers import get_part_info
 from urllib3 import HTTPResponse
 
-from awesome_object_store.base import BaseObjectStore
+from awesome_object_store.base import (
+    CHECKSUM_RETRIES,
+    DEFAULT_PART_SIZE,
+    LIST_PAGE_SIZE,
+    BaseObjectStore,
+)
+from awesome_object_store.rate_limit import ThrottledStream
+from awesome_object_store.utils import ChecksumMismatchError, ChecksumStream, json_loads
 
+T = TypeVar("T")
+
+
+def _predecessor(key: str) -> str:
+    """Return a key sorting right before key, for an exclusive start_after."""
+    last = ord(key[-1])
+    return key[:-1] + (chr(last - 1) if last else "")
 
-class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
-    client: Minio
 
+class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
     def __init__(
         self,
         bucket: str,
@@ -25,10 +41,13 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
         secure: bool = False,
         region: Optional[str] = None,
         logger: Optional[Logger] = None,
+        verify_checksum: bool = False,
     ):
         self.bucket = bucket
-        self.client = Minio(
-            host,
+        self.endpoint = host or ""
+        self.verify_checksum = verify_checksum
+        self.client_config: Dict[str, Any] = dict(
+            endpoint=host,
             access_key=access_key,
             secret_key=secret_key,
             secure=secure,
@@ -42,14 +61,25 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
         else:
             self.logger.info("bucket '%s' exists", self.bucket)
 
+    @property
+    def client(self) -> Minio:
+        """The client of the current process, created on first use."""
+        if self._client_stale():
+            self._client = Minio(**self.client_config)
+            self._client_pid = os.getpid()
+        return self._client
+
     def create_bucket(self, bucket_name: str):
+        self._throttle()
         self.client.make_bucket(bucket_name)
 
     def bucket_exists(self, bucket_name: str) -> bool:
+        self._throttle()
         return self.client.bucket_exists(bucket_name)
 
     def list_buckets(self):
         """List information of all accessible buckets with text."""
+        self._throttle()
         return [x.name for x in self.client.list_buckets()]
 
     def list_objects(
@@ -59,54 +89,220 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
         start_offset: Optional[str] = None,
         end_offset: Optional[str] = None,
     ):
-        """Lists object information of a bucket with text."""
-        if start_offset is not None or end_offset is not None:
-            raise Exception("Minio client does not support start_offset or end_offset.")
-        return [
-            x.object_name
-            for x in self.client.list_objects(
-                self.bucket, prefix=prefix, recursive=recursive
+        """Lists object information of a bucket with text.
+
+        start_offset (inclusive) and end_offset (exclusive) are emulated with
+        start_after and by stopping a recursive listing once end_offset is
+        reached. Delimited listings return each page's objects before its
+        prefixes, so they are filtered to end_offset instead.
+        """
+        cached = self._cached_list_objects(prefix, recursive, start_offset, end_offset)
+        if cached is not None:
+            return cached
+        start_after = None
+        if start_offset:
+            # start_after is exclusive, start listing just before start_offset
+            # or before the delimited prefix that contains it.
+            separator = start_offset.find("/", len(prefix or ""))
+            if not recursive and separator >= 0:
+                start_after = _predecessor(start_offset[: separator + 1])
+            else:
+                start_after = _predecessor(start_offset)
+        objects = []
+        for index, x in enumerate(
+            self.client.list_objects(
+                self.bucket,
+                prefix=prefix,
+                recursive=recursive,
+                start_after=start_after or None,
             )
-        ]
+        ):
+            if index % LIST_PAGE_SIZE == 0:
+                self._throttle()
+            name = x.object_name
+            if start_offset is not None and name < start_offset:
+                # keep delimited prefixes that contain start_offset
+                if not (name.endswith("/") and start_offset.startswith(name)):
+                    continue
+            if end_offset is not None and name >= end_offset:
+                if recursive:
+                    break
+                continue
+            objects.append(name)
+        self._index_listing(prefix, recursive, start_offset, end_offset, objects)
+        return objects
 
     def fput(self, name: str, file_path: str, exclude_files: List[str] = []):
         """Uploads data from a file/folder to an object in a bucket."""
-        if path.isdir(file_path):
-            for local_file in glob.glob(file_path + "/**"):
-                file_name = Path(local_file).name
-                remote_path = path.join(name, file_name)
-
-                if file_name in exclude_files:
-                    self.logger.info(f"exclude: {local_file}")
-                    continue
-
-                if not path.isfile(local_file):
-                    self.fput(remote_path, local_file, exclude_files)
-                else:
-                    remote_path = path.join(name, local_file[1 + len(file_path) :])
-                    self.client.fput_object(self.bucket, remote_path, local_file)
-        else:
-            self.client.fput_object(self.bucket, name, file_path)
+        for remote_path, local_file in self._walk_files(name, file_path, exclude_files):
+            self._throttle(nbytes=path.getsize(local_file))
+            self._fput_object(remote_path, local_file)
+            self._index_add(remote_path)
 
     def put(
         self,
         name: str,
-        data: IO,
+        data: Union[IO, RawIOBase],
         length: Optional[int] = None,
         content_type: str = "application/octet-stream",
     ):
-        """Uploads data from a stream to an object in a bucket."""
+        """Uploads data from a stream to an object in a bucket.
+
+        A length of -1 uploads a stream of unknown size in parts.
+        """
         if not length:
             length = len(data.read())
             data.seek(0)
 
-        self.client.put_object(
-            self.bucket, name, data, length, content_type=content_type
-        )
+        if length == -1:
+            part_size = DEFAULT_PART_SIZE
+            self._throttle()
+            data = ThrottledStream(data, self._throttle_bytes)
+        else:
+            part_size = 0
+            self._throttle(nbytes=length)
+        if self.verify_checksum:
+            self._put_verified(name, data, length, content_type, part_size)
+        else:
+            self.client.put_object(
+                self.bucket,
+                name,
+                data,
+                length,
+                content_type=content_type,
+                part_size=part_size,
+            )
+        self._index_add(name)
+
+    def _fput_object(self, name: str, file_path: str):
+        if not self.verify_checksum:
+            self.client.fput_object(self.bucket, name, file_path)
+            return
+        with open(file_path, "rb") as data:
+            self._put_verified(
+                name, data, path.getsize(file_path), "application/octet-stream", 0
+            )
+
+    def _put_verified(
+        self,
+        name: str,
+        data: Union[IO, RawIOBase],
+        length: int,
+        content_type: str,
+        part_size: int,
+    ):
+        """Uploads data while computing its ETag, retrying on a mismatch."""
+        etag_part_size = part_size or get_part_info(length, 0)[0]
+        start = data.tell() if data.seekable() else None
+        for _ in range(CHECKSUM_RETRIES + 1):
+            stream = ChecksumStream(data, etag_part_size)
+            result = self.client.put_object(
+                self.bucket,
+                name,
+                stream,  # type: ignore
+                length,
+                content_type=content_type,
+                part_size=part_size,
+            )
+            if stream.matches(result.etag or ""):
+                return
+            if start is None:
+                break
+            self.logger.warning("checksum mismatch uploading %s, retrying", name)
+            data.seek(start)
+        self.remove_object(name)
+        raise ChecksumMismatchError(f"checksum mismatch uploading {name}")
+
+    def _etag_part_size(self, name: str, etag: str) -> Optional[int]:
+        """Returns the part size of a multipart ETag, None for a single part."""
+        if "-" not in etag:
+            return None
+        # all parts but the last have the size of the first one
+        self._throttle()
+        return self.client.stat_object(
+            self.bucket, name, extra_query_params={"partNumber": "1"}
+        ).size
+
+    def _read_verified(self, name: str, read: Callable[[IO[bytes]], T]) -> T:
+        """Reads an object while computing its ETag, retrying on a mismatch."""
+        for _ in range(CHECKSUM_RETRIES + 1):
+            response = self.get(name)
+            try:
+                etag = response.headers.get("ETag", "")
+                stream = ChecksumStream(response, self._etag_part_size(name, etag))
+                error: Optional[Exception] = None
+                try:
+                    result = read(stream)  # type: ignore
+                except Exception as e:
+                    # corrupted data may fail to parse, check it before raising
+                    error = e
+                while stream.read(DEFAULT_PART_SIZE):
+                    pass
+            finally:
+                response.close()
+                response.release_conn()
+            if stream.matches(etag):
+                if error is not None:
+                    raise error
+                return result
+            self.logger.warning("checksum mismatch reading %s, retrying", name)
+        raise ChecksumMismatchError(f"checksum mismatch reading {name}")
+
+    def copy_object(self, source: str, name: str):
+        """Copies an object server side."""
+        self._throttle()
+        self.client.copy_object(self.bucket, name, CopySource(self.bucket, source))
+        self._index_add(name)
 
     def get(self, name: str):
         """Gets data of an object."""
-        return self.client.get_object(self.bucket, name)
+        self._throttle()
+        response = self.client.get_object(self.bucket, name)
+        self._throttle_bytes(int(response.headers.get("Content-Length", 0)))
+        return response
+
+    @contextmanager
+    def get_stream(self, name: str) -> Iterator[IO[bytes]]:
+        """Gets data of an object as a stream, releasing it on exit.
+
+        With verify_checksum, reading the stream to the end raises
+        ChecksumMismatchError when the data does not match the ETag.
+        """
+        self._throttle()
+        response = self.client.get_object(self.bucket, name)
+        try:
+            stream = ThrottledStream(response, self._throttle_bytes)  # type: ignore
+            if self.verify_checksum:
+                etag = response.headers.get("ETag", "")
+                part_size = self._etag_part_size(name, etag)
+                yield ChecksumStream(stream, part_size, etag)  # type: ignore
+            else:
+                yield stream  # type: ignore
+        finally:
+            response.close()
+            response.release_conn()
+
+    def get_size(self, name: str) -> int:
+        """Gets the size of an object in bytes."""
+        self._throttle()
+        return self.client.stat_object(self.bucket, name).size or 0
+
+    def get_etag(self, name: str) -> str:
+        """Gets the etag of an object, which changes whenever it is rewritten."""
+        self._throttle()
+        return self.client.stat_object(self.bucket, name).etag or ""
+
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        """Gets length bytes of an object starting at offset."""
+        self._throttle(nbytes=length)
+        response = self.client.get_object(
+            self.bucket, name, offset=offset, length=length
+        )
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
 
     def get_df(
         self,
@@ -115,26 +311,21 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
         date_columns: List[str] = [],
         usecols: Optional[List] = None,
         converters: Optional[dict] = None,
+        compact: bool = False,
     ) -> Optional[pd.DataFrame]:
         """Gets data of an object and return a dataframe."""
         try:
+            read_csv = self._df_reader(
+                name, column_types, date_columns, usecols, converters, compact
+            )
+            if self.verify_checksum:
+                return self._read_verified(name, read_csv)
             file_obj = self.get(name)
         except S3Error as e:
             self.logger.warning(e)
             return None
 
-        if not date_columns:
-            df = pd.read_csv(
-                file_obj, dtype=column_types, usecols=usecols, converters=converters
-            )
-        else:
-            df = pd.read_csv(
-                file_obj,
-                parse_dates=date_columns,
-                dtype=column_types,
-                usecols=usecols,
-                converters=converters,
-            )
+        df = read_csv(file_obj)
         file_obj.close()
         file_obj.release_conn()
         return df
@@ -142,17 +333,20 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
     def get_json(self, name: str) -> dict:
         """Gets data of an object and return a json."""
         try:
+            if self.verify_checksum:
+                return self._read_verified(name, lambda f: json_loads(f.read()))
             file_obj = self.get(name)
         except S3Error as e:
             self.logger.warning(e)
             return {}
-        result = json.load(file_obj)
+        result = json_loads(file_obj.read())
         file_obj.close()
         file_obj.release_conn()
         return result
 
     def exists(self, name: str) -> bool:
         """Check if object or bucket exist."""
+        self._throttle()
         try:
             self.client.stat_object(self.bucket, name)
             return True
@@ -161,8 +355,19 @@ class MinioStore(BaseObjectStore[Bucket, HTTPResponse]):
 
     def remove_object(self, name: str):
         """Remove an object."""
+        self._throttle()
         self.client.remove_object(self.bucket, name)
+        self._index_remove(name)
 
     def download(self, name: str, file_path: str):
         """Downloads data of an object to file."""
+        if self.verify_checksum:
+            self._read_verified(name, lambda f: self._write_file(f, file_path))
+            return
+        self._throttle()
         self.client.fget_object(self.bucket, name, file_path)
+        self._throttle_bytes(path.getsize(file_path))
+
+    def _write_file(self, data: IO[bytes], file_path: str):
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(data, f, DEFAULT_PART_SIZE)
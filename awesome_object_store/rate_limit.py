@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from io import RawIOBase
+from typing import IO, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled at rate tokens per second.
+
+    acquire may take more tokens than are available, leaving the bucket in
+    debt; the caller then sleeps until the debt is repaid. This lets transfers
+    whose size is only known afterwards be charged after the fact.
+    """
+
+    def __init__(
+        self, rate: float, capacity: Optional[float] = None, window: float = 10.0
+    ):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.window = window
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._history: Deque[Tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        """Take amount tokens, sleeping while the bucket is in debt."""
+        if amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            self._history.append((now, amount))
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def utilization(self) -> float:
+        """Return the share of rate consumed over the last window seconds."""
+        with self._lock:
+            since = time.monotonic() - self.window
+            while self._history and self._history[0][0] < since:
+                self._history.popleft()
+            consumed = sum(amount for _, amount in self._history)
+        return consumed / (self.rate * self.window)
+
+
+class RateLimiter:
+    """Limits bytes per second and requests per second of object store calls."""
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        requests_per_second: Optional[float] = None,
+    ):
+        self.bytes = None if bytes_per_second is None else TokenBucket(bytes_per_second)
+        self.requests = (
+            None if requests_per_second is None else TokenBucket(requests_per_second)
+        )
+
+    def acquire(self, requests: int = 1, nbytes: int = 0) -> None:
+        if self.requests is not None:
+            self.requests.acquire(requests)
+        if self.bytes is not None:
+            self.bytes.acquire(nbytes)
+
+    def utilization(self) -> Dict[str, float]:
+        """Return the recent utilization of each configured limit."""
+        result = {}
+        if self.bytes is not None:
+            result["bytes"] = self.bytes.utilization()
+        if self.requests is not None:
+            result["requests"] = self.requests.utilization()
+        return result
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def set_rate_limit(
+    key: str,
+    bytes_per_second: Optional[float] = None,
+    requests_per_second: Optional[float] = None,
+) -> RateLimiter:
+    """Limit every store of this process using an endpoint or endpoint/bucket.
+
+    key is either an endpoint, e.g. ``localhost:9000`` or
+    ``storage.googleapis.com``, or ``{endpoint}/{bucket}``. A store is
+    limited by both its endpoint and its bucket limits when both are set.
+    """
+    limiter = RateLimiter(bytes_per_second, requests_per_second)
+    _rate_limiters[key] = limiter
+    return limiter
+
+
+def remove_rate_limit(key: str) -> None:
+    _rate_limiters.pop(key, None)
+
+
+def get_rate_limiters(endpoint: str, bucket: str) -> List[RateLimiter]:
+    return [
+        _rate_limiters[key]
+        for key in (endpoint, f"{endpoint}/{bucket}")
+        if key in _rate_limiters
+    ]
+
+
+class ThrottledStream(RawIOBase):
+    """A read-only file object charging every read to a throttle callback."""
+
+    def __init__(
+        self, raw: Union[IO[bytes], RawIOBase], throttle: Callable[[int], None]
+    ):
+        self._raw = raw
+        self._throttle = throttle
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+        while filled < len(view):
+            data = self._raw.read(len(view) - filled)
+            if not data:
+                break
+            view[filled : filled + len(data)] = data
+            filled += len(data)
+        self._position += filled
+        self._throttle(filled)
+        return filled
+
+    def close(self) -> None:
+        if not self.closed:
+            self._raw.close()
+        super().close()
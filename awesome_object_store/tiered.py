@@ -0,0 +1,278 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import RawIOBase
+from logging import Logger
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Union
+
+import pandas as pd
+
+from awesome_object_store.base import DEFAULT_PART_SIZE, BaseObjectStore
+
+WRITE_THROUGH = "write-through"
+WRITE_BACK = "write-back"
+
+
+class TierPolicy:
+    """How a TieredObjectStore treats the keys under a prefix.
+
+    write_mode is WRITE_THROUGH to write both tiers at once, or WRITE_BACK to
+    write the fast tier only until flush. promote copies objects read from
+    the slow tier into the fast tier.
+    """
+
+    def __init__(self, write_mode: str = WRITE_THROUGH, promote: bool = True):
+        if write_mode not in (WRITE_THROUGH, WRITE_BACK):
+            raise ValueError(f"unknown write mode {write_mode}")
+        self.write_mode = write_mode
+        self.promote = promote
+
+
+class TieredObjectStore(BaseObjectStore[Any, Any]):
+    """A fast object store, e.g. a MinIO near compute, in front of a slow one.
+
+    The slow store is the source of truth. Reads are served by the fast tier
+    when it has the object, otherwise by the slow tier, promoting the object
+    into the fast tier. policies maps key prefixes to a TierPolicy, the
+    longest matching prefix wins and default_policy applies to other keys.
+    """
+
+    def __init__(
+        self,
+        fast: BaseObjectStore,
+        slow: BaseObjectStore,
+        policies: Optional[Dict[str, TierPolicy]] = None,
+        default_policy: Optional[TierPolicy] = None,
+        logger: Optional[Logger] = None,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.bucket = slow.bucket
+        self.endpoint = slow.endpoint
+        self.policies = policies or {}
+        self.default_policy = default_policy or TierPolicy()
+        self.logger = logger if logger is not None else slow.logger
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        super().__setstate__(state)
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "TieredObjectStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def policy(self, name: str) -> TierPolicy:
+        """Return the policy of the longest prefix matching name."""
+        matches = [prefix for prefix in self.policies if name.startswith(prefix)]
+        if not matches:
+            return self.default_policy
+        return self.policies[max(matches, key=len)]
+
+    def _mark(self, name: str, tier: BaseObjectStore) -> None:
+        """Record name as written to tier, to be flushed if it is write-back."""
+        with self._lock:
+            if tier is self.fast and self.policy(name).write_mode == WRITE_BACK:
+                self._dirty.add(name)
+            else:
+                self._dirty.discard(name)
+
+    def _write_tiers(self, name: str) -> List[BaseObjectStore]:
+        if self.policy(name).write_mode == WRITE_BACK:
+            return [self.fast]
+        return [self.slow, self.fast]
+
+    def _promote(self, name: str) -> None:
+        with tempfile.NamedTemporaryFile() as file:
+            self.slow.download(name, file.name)
+            self.fast.fput(name, file.name)
+
+    def _read_tier(self, name: str) -> BaseObjectStore:
+        """Return the tier to read name from, promoting it when allowed."""
+        if self.fast.exists(name):
+            return self.fast
+        if self.policy(name).promote and self.slow.exists(name):
+            self._promote(name)
+            return self.fast
+        return self.slow
+
+    def flush(self) -> None:
+        """Copy the objects written back to the fast tier to the slow tier."""
+        with self._lock:
+            dirty = sorted(self._dirty)
+        for name in dirty:
+            with tempfile.NamedTemporaryFile() as file:
+                self.fast.download(name, file.name)
+                self.slow.fput(name, file.name)
+            with self._lock:
+                self._dirty.discard(name)
+
+    def create_bucket(self, bucket_name: str) -> None:
+        self.slow.create_bucket(bucket_name)
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return self.slow.bucket_exists(bucket_name)
+
+    def list_buckets(self):
+        """List information of all accessible buckets of the slow tier."""
+        return self.slow.list_buckets()
+
+    def list_objects(
+        self,
+        prefix: str = None,
+        recursive: bool = False,
+        start_offset: Optional[str] = None,
+        end_offset: Optional[str] = None,
+    ):
+        """Lists objects of the slow tier and objects not yet flushed to it."""
+        objects = self.slow.list_objects(prefix, recursive, start_offset, end_offset)
+        with self._lock:
+            dirty = list(self._dirty)
+        if any(name.startswith(prefix or "") for name in dirty):
+            objects = sorted(
+                set(objects).union(
+                    self.fast.list_objects(prefix, recursive, start_offset, end_offset)
+                )
+            )
+        return objects
+
+    def fput(self, name: str, file_path: str, exclude_files: List[str] = []):
+        """Uploads data from a file/folder to the tiers of its policy."""
+        for tier in self._write_tiers(name):
+            tier.fput(name, file_path, exclude_files)
+        if self.policy(name).write_mode == WRITE_BACK:
+            keys = [name]
+            if os.path.isdir(file_path):
+                keys = self.fast.list_objects(name.rstrip("/") + "/", recursive=True)
+            for key in keys:
+                self._mark(key, self.fast)
+
+    def put(
+        self,
+        name: str,
+        data: Union[IO, RawIOBase],
+        length: Optional[int] = None,
+        content_type: str = "application/octet-stream",
+    ):
+        """Uploads data from a stream to the tiers of its policy.
+
+        Streams that cannot seek are spooled to a temporary file first when
+        they have to be written to both tiers.
+        """
+        tiers = self._write_tiers(name)
+        if len(tiers) == 1 or data.seekable():
+            self._put_tiers(tiers, name, data, length, content_type)
+            return
+        with tempfile.SpooledTemporaryFile(max_size=DEFAULT_PART_SIZE) as spool:
+            shutil.copyfileobj(data, spool, DEFAULT_PART_SIZE)
+            length = spool.tell()
+            spool.seek(0)
+            self._put_tiers(tiers, name, spool, length, content_type)
+
+    def _put_tiers(
+        self,
+        tiers: List[BaseObjectStore],
+        name: str,
+        data: Union[IO, RawIOBase],
+        length: Optional[int],
+        content_type: str,
+    ):
+        start = data.tell() if data.seekable() else None
+        for tier in tiers:
+            if start is not None:
+                data.seek(start)
+            tier.put(name, data, length, content_type)
+            self._mark(name, tier)
+
+    def copy_object(self, source: str, name: str):
+        """Copies an object server side on the tiers of its policy.
+
+        A write-back copy is made in the fast tier, so a source only in the
+        slow tier is promoted first, whatever the policy of the source.
+        """
+        if self.policy(name).write_mode == WRITE_BACK:
+            if not self.fast.exists(source) and self.slow.exists(source):
+                self._promote(source)
+            self.fast.copy_object(source, name)
+            self._mark(name, self.fast)
+            return
+        self.slow.copy_object(source, name)
+        self._mark(name, self.slow)
+        if self.fast.exists(source):
+            self.fast.copy_object(source, name)
+        elif self.fast.exists(name):
+            self.fast.remove_object(name)
+
+    def get(self, name: str):
+        """Gets data of an object from the fastest tier holding it."""
+        return self._read_tier(name).get(name)
+
+    @contextmanager
+    def get_stream(self, name: str) -> Iterator[IO[bytes]]:
+        """Gets data of an object as a stream from the fastest tier holding it."""
+        with self._read_tier(name).get_stream(name) as stream:
+            yield stream
+
+    def get_size(self, name: str) -> int:
+        return self._read_tier(name).get_size(name)
+
+    def get_etag(self, name: str) -> str:
+        return self._read_tier(name).get_etag(name)
+
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        return self._read_tier(name).get_range(name, offset, length)
+
+    def get_df(
+        self,
+        name: str,
+        column_types: dict = {},
+        date_columns: List[str] = [],
+        usecols: Optional[List] = None,
+        converters: Optional[dict] = None,
+        compact: bool = False,
+    ) -> Optional[pd.DataFrame]:
+        """Gets a dataframe from the fastest tier holding the object.
+
+        A compact read looks up the schema of the object through the tiers
+        too, since promoting the object does not copy its schema.
+        """
+        tier = self._read_tier(name)
+        if not compact:
+            return tier.get_df(name, column_types, date_columns, usecols, converters)
+        if tier is self.slow and not self.slow.exists(name):
+            return None
+        read_csv = self._df_reader(
+            name, column_types, date_columns, usecols, converters, compact
+        )
+        with tier.get_stream(name) as stream:
+            return read_csv(stream)
+
+    def get_json(self, name: str) -> dict:
+        """Gets a json from the fastest tier holding the object."""
+        return self._read_tier(name).get_json(name)
+
+    def exists(self, name: str) -> bool:
+        """Check if object exists in any tier."""
+        return self.fast.exists(name) or self.slow.exists(name)
+
+    def remove_object(self, name: str):
+        """Remove an object from both tiers."""
+        with self._lock:
+            self._dirty.discard(name)
+        for tier in (self.fast, self.slow):
+            if tier.exists(name):
+                tier.remove_object(name)
+
+    def download(self, name: str, file_path: str):
+        """Downloads data of an object to file from the fastest tier holding it."""
+        self._read_tier(name).download(name, file_path)
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import math
+import mmap
+import re
+from enum import Enum
+from io import SEEK_CUR, SEEK_END, SEEK_SET, RawIOBase
+from typing import IO, Any, Container, Dict, Iterable, List, Optional, Union
+from uuid import UUID
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+if orjson is not None:
+    # json rejects datetimes and dataclasses, so orjson must not encode them
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# orjson encodes UUIDs as strings like this, json rejects them
+_UUID_STRING = re.compile(
+    rb'"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"'
+)
+# orjson decodes integers beyond 64 bits as floats, json keeps them exact
+_LONG_DIGITS = re.compile(rb"\d{19}")
+_LONG_DIGITS_STR = re.compile(r"\d{19}")
+
+
+def _json_differs(data: Any) -> bool:
+    """Whether orjson encodes data differently from json or where json raises."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_json_differs(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_json_differs(value) for value in data)
+    return isinstance(data, UUID) or (
+        isinstance(data, Enum) and not isinstance(data, (str, int, float))
+    )
+
+
+def json_dumps(data: Any) -> bytes:
+    """Serialize data to json bytes, using orjson when it is installed.
+
+    The output decodes the same as json.dumps, whether orjson is installed
+    or not, and data json.dumps rejects raises TypeError either way. Enum
+    members are the exception: orjson encodes their values, since they leave
+    no trace in the output to check for cheaply.
+    """
+    if orjson is not None:
+        try:
+            result = orjson.dumps(data, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson rejects some inputs json accepts, e.g. non-str dict keys.
+            pass
+        else:
+            # orjson writes NaN and Infinity as null, json keeps them
+            if (
+                b"null" not in result and not _UUID_STRING.search(result)
+            ) or not _json_differs(data):
+                return result
+    return json.dumps(data).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, memoryview, str]) -> Any:
+    """Deserialize json bytes or str, using orjson when it is installed."""
+    long_digits = _LONG_DIGITS_STR if isinstance(data, str) else _LONG_DIGITS
+    if orjson is not None and not long_digits.search(data):  # type: ignore
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. NaN and Infinity, which json accepts
+            pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def compact_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5) -> Dict:
+    """Returns the smallest dtype holding the values of each column.
+
+    Integers are downcast, floats only when every value survives the round
+    trip, and string columns with at most max_category_ratio distinct values
+    per row become categories.
+    """
+    dtypes = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            downcast = "unsigned" if series.min() >= 0 else "integer"
+            dtypes[column] = str(pd.to_numeric(series, downcast=downcast).dtype)
+        elif pd.api.types.is_float_dtype(series):
+            downcast = pd.to_numeric(series, downcast="float")
+            if downcast.astype(series.dtype).equals(series):
+                dtypes[column] = str(downcast.dtype)
+        elif isinstance(series.dtype, pd.CategoricalDtype) or (
+            pd.api.types.is_object_dtype(series)
+            and series.nunique() <= max_category_ratio * len(series)
+        ):
+            dtypes[column] = "category"
+    return dtypes
+
+
+def compact_df(
+    df: pd.DataFrame, max_category_ratio: float = 0.5, exclude: Container = ()
+) -> pd.DataFrame:
+    """Returns df with the dtypes of compact_dtypes, except excluded columns."""
+    dtypes = compact_dtypes(df, max_category_ratio)
+    return df.astype({k: v for k, v in dtypes.items() if k not in exclude})
+
+
+class IterStream(RawIOBase):
+    """A read-only file object over an iterable of bytes chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer: Optional[memoryview] = None
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+        while filled < len(view):
+            if not self._buffer:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer = memoryview(chunk)
+                continue
+            n = min(len(view) - filled, len(self._buffer))
+            view[filled : filled + n] = self._buffer[:n]
+            self._buffer = self._buffer[n:]
+            filled += n
+        self._position += filled
+        return filled
+
+
+class MmapReader(RawIOBase):
+    """A read-only, seekable file object over a memory map."""
+
+    def __init__(self, buffer: mmap.mmap):
+        self._mmap = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        n = max(0, min(len(view), len(self._mmap) - self._position))
+        view[:n] = self._mmap[self._position : self._position + n]
+        self._position += n
+        return n
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_CUR:
+            offset += self._position
+        elif whence == SEEK_END:
+            offset += len(self._mmap)
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+        self._position = offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def getbuffer(self) -> memoryview:
+        """Return a read-only view of the mapped data without copying it."""
+        return memoryview(self._mmap)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view returned by getbuffer is still alive, the mapping is
+                # released when it is garbage collected.
+                pass
+        super().close()
+
+
+class ChecksumMismatchError(Exception):
+    """Raised when transferred data does not match the checksum of the server."""
+
+
+class ChecksumStream(RawIOBase):
+    """A read-only file object computing the S3 ETag of the data read through it.
+
+    The md5 of the whole stream is kept together with the md5 of every
+    part_size part, so both single part and multipart ETags can be checked.
+    With etag, reading to the end raises ChecksumMismatchError on a mismatch.
+    """
+
+    def __init__(
+        self,
+        raw: Union[IO[bytes], RawIOBase],
+        part_size: Optional[int] = None,
+        etag: Optional[str] = None,
+    ):
+        self._raw = raw
+        self.part_size = part_size
+        self.etag = etag
+        self._md5 = hashlib.md5()
+        self._part_md5s: List[bytes] = []
+        self._part = hashlib.md5()
+        self._part_length = 0
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        filled = 0
+        while filled < len(view):
+            data = self._raw.read(len(view) - filled)
+            if not data:
+                break
+            view[filled : filled + len(data)] = data
+            filled += len(data)
+            self._update(data)
+        self._position += filled
+        if not filled and len(view) and self.etag is not None:
+            etag, self.etag = self.etag, None
+            if not self.matches(etag):
+                raise ChecksumMismatchError("checksum mismatch at end of stream")
+        return filled
+
+    def _update(self, data: bytes) -> None:
+        self._md5.update(data)
+        if not self.part_size:
+            return
+        view = memoryview(data)
+        while view:
+            n = min(len(view), self.part_size - self._part_length)
+            self._part.update(view[:n])
+            self._part_length += n
+            view = view[n:]
+            if self._part_length == self.part_size:
+                self._part_md5s.append(self._part.digest())
+                self._part = hashlib.md5()
+                self._part_length = 0
+
+    def matches(self, etag: str) -> bool:
+        """Check the data read so far against a single part or multipart ETag."""
+        etag = etag.strip('"')
+        if "-" not in etag:
+            return etag == self._md5.hexdigest()
+        part_md5s = self._part_md5s[:]
+        if self._part_length:
+            part_md5s.append(self._part.digest())
+        multipart = hashlib.md5(b"".join(part_md5s)).hexdigest()
+        return etag == f"{multipart}-{len(part_md5s)}"
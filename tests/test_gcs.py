@@ -144,3 +144,27 @@ async def test_list_objects(google_cloud_store, test_dict, test_file_name):
     assert blobs[1] == f"{test_file_name}/2.json"
     assert blobs[2] == f"{test_file_name}/3.json"
     google_cloud_store.remove_dir(test_file_name)
+
+
+def test_put_and_iter_ndjson(google_cloud_store, test_dict, test_file_name):
+    records = [dict(test_dict, i=i) for i in range(10)]
+    google_cloud_store.put_ndjson(test_file_name, iter(records))
+    assert list(google_cloud_store.iter_ndjson(test_file_name)) == records
+    google_cloud_store.remove_object(test_file_name)
+
+
+def test_get_mmap(google_cloud_store, test_dataframe, test_dict, test_file_name):
+    google_cloud_store.mmap_threshold = 16
+    google_cloud_store.upload_df(test_file_name, test_dataframe)
+    df = google_cloud_store.get_df(test_file_name)
+    assert df.shape == test_dataframe.shape
+    google_cloud_store.put_as_json(test_file_name, test_dict)
+    assert google_cloud_store.get_json(test_file_name) == test_dict
+    google_cloud_store.remove_object(test_file_name)
+
+
+def test_verify_checksum(google_cloud_store, test_dict, test_file_name):
+    google_cloud_store.verify_checksum = True
+    google_cloud_store.put_as_json(test_file_name, test_dict)
+    assert google_cloud_store.get_json(test_file_name) == test_dict
+    google_cloud_store.remove_object(test_file_name)
@@ -0,0 +1,66 @@
+import pickle
+import time
+
+from awesome_object_store import ListingIndex
+
+
+def test_query_recursive_and_delimited():
+    index = ListingIndex()
+    assert index.query("data/") is None
+    index.load("data/", ["data/b/2.csv", "data/a.csv", "data/b/1.csv", "data/c"])
+    assert index.query("data/", recursive=True) == [
+        "data/a.csv",
+        "data/b/1.csv",
+        "data/b/2.csv",
+        "data/c",
+    ]
+    assert index.query("data/") == ["data/a.csv", "data/b/", "data/c"]
+    assert index.query("data/b/") == ["data/b/1.csv", "data/b/2.csv"]
+    assert index.query("other/") is None
+
+
+def test_query_offsets():
+    index = ListingIndex()
+    index.load("", [f"{i}.json" for i in range(6)])
+    assert index.query("", start_offset="1", end_offset="4") == [
+        "1.json",
+        "2.json",
+        "3.json",
+    ]
+
+
+def test_add_remove_and_expiry():
+    index = ListingIndex(ttl=60)
+    index.load("data/", ["data/a.csv"])
+    index.add("data/b.csv")
+    index.add("data/b.csv")
+    index.add("other/c.csv")
+    assert index.query("data/") == ["data/a.csv", "data/b.csv"]
+    index.remove("data/a.csv")
+    assert index.query("data/") == ["data/b.csv"]
+    index.ttl = 0
+    time.sleep(0.01)
+    assert index.query("data/") is None
+
+
+def test_save_load_and_pickle(tmp_path):
+    path = str(tmp_path / "index.json")
+    index = ListingIndex(path=path)
+    index.load("data/", ["data/a.csv"])
+    assert ListingIndex(path=path).query("data/") == ["data/a.csv"]
+    index.add("data/b.csv")
+    index.remove("data/a.csv")
+    assert ListingIndex(path=path).query("data/") == ["data/a.csv"]
+    index.save()
+    assert ListingIndex(path=path).query("data/") == ["data/b.csv"]
+    assert pickle.loads(pickle.dumps(index)).query("data/") == ["data/b.csv"]
+
+
+def test_unreadable_file_is_empty(tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text('{"data/": {"loaded_at": 1, "ke')
+    index = ListingIndex(path=str(path))
+    assert index.query("data/") is None
+    index.load("data/", ["data/a.csv"])
+    assert ListingIndex(path=str(path)).query("data/") == ["data/a.csv"]
+    assert [p.name for p in tmp_path.iterdir()] == ["index.json"]
@@ -1,10 +1,19 @@
+import json
 import os
+import pickle
 import tempfile
+from io import BytesIO
 
 import pandas as pd
 import pytest
 from starlette.datastructures import UploadFile
 
+from awesome_object_store import BufferedWriter, ListingIndex
+
+
+def _get_i(store, name):
+    return store.get_json(name)["i"]
+
 
 def test_bucket_creation(minio_store):
     buckets = minio_store.list_buckets()
@@ -119,6 +128,213 @@ async def test_fget_df(minio_store, test_dataframe):
         assert df is None
 
 
-async def test_list_objects_with_invalid_args(minio_store, test_dict):
-    with pytest.raises(Exception):
-        minio_store.list_objects("", start_offset="2", end_offset="4")
+async def test_list_objects(minio_store, test_dict):
+    for i in range(6):
+        minio_store.put_as_json(f"offsets/{i}.json", test_dict)
+    blobs = minio_store.list_objects(
+        "offsets/",
+        start_offset="offsets/1",
+        end_offset="offsets/4",
+    )
+    assert blobs == ["offsets/1.json", "offsets/2.json", "offsets/3.json"]
+    minio_store.put_as_json("offsets/0/a.json", test_dict)
+    blobs = minio_store.list_objects("offsets/", end_offset="offsets/2")
+    assert sorted(blobs) == ["offsets/0.json", "offsets/0/", "offsets/1.json"]
+    minio_store.remove_dir("offsets")
+
+
+def test_list_objects_parallel(minio_store, test_dict):
+    names = [f"sharded/{i}/{j}.json" for i in range(3) for j in range(2)]
+    for name in names:
+        minio_store.put_as_json(name, test_dict)
+    assert minio_store.list_objects_parallel("sharded/") == names
+    boundaries = ["sharded/1", "sharded/2/1"]
+    assert minio_store.list_objects_parallel("sharded/", boundaries) == names
+    minio_store.remove_dir("sharded")
+
+
+def test_write_and_read_dataset(minio_store, test_dataframe):
+    keys = minio_store.write_dataset(
+        "dataset", test_dataframe, partition_cols=["column_0_cat"]
+    )
+    assert len(keys) == test_dataframe["column_0_cat"].nunique()
+    df = minio_store.read_dataset("dataset")
+    assert df.shape == test_dataframe.shape
+    value = test_dataframe["column_0_cat"].iloc[0]
+    df = minio_store.read_dataset("dataset", filters={"column_0_cat": value})
+    assert df.shape[0] == (test_dataframe["column_0_cat"] == value).sum()
+    assert (df["column_0_cat"] == value).all()
+    assert minio_store.read_dataset("dataset", filters={"column_0_cat": "none"}) is None
+    df = minio_store.read_dataset("dataset", usecols=["column_0_cat"])
+    assert df.shape == (test_dataframe.shape[0], 1)
+    minio_store.remove_dir("dataset")
+    years = pd.DataFrame({"year": [2020, None, 2021], "value": [1, 2, 3]})
+    minio_store.write_dataset("dataset", years, partition_cols=["year"])
+    df = minio_store.read_dataset("dataset", filters={"year": 2020})
+    assert df["value"].tolist() == [1]
+    minio_store.remove_dir("dataset")
+    with pytest.raises(ValueError):
+        minio_store.write_dataset("dataset", years, partition_cols=["year", "value"])
+    years["year"] = pd.Categorical(years["year"], categories=[2019, 2020, 2021])
+    keys = minio_store.write_dataset("dataset", years, partition_cols=["year"])
+    assert len(keys) == 3
+    assert minio_store.read_dataset("dataset").shape == (3, 2)
+    minio_store.remove_dir("dataset")
+
+
+def test_get_df_parallel(minio_store, test_dataframe):
+    minio_store.upload_df("test.csv", test_dataframe)
+    df = minio_store.get_df_parallel(
+        "test.csv", date_columns=["column_4_date"], chunk_size=1024
+    )
+    expected = minio_store.get_df("test.csv", date_columns=["column_4_date"])
+    pd.testing.assert_frame_equal(df, expected)
+    assert minio_store.get_df_parallel("not_exist.csv") is None
+    mixed = pd.DataFrame({"a": [str(i) for i in range(200)] + ["x0", "x1"]})
+    minio_store.upload_df("mixed.csv", mixed)
+    df = minio_store.get_df_parallel("mixed.csv", chunk_size=64)
+    pd.testing.assert_frame_equal(df, minio_store.get_df("mixed.csv"))
+    minio_store.remove_object("mixed.csv")
+    minio_store.put("header.csv", BytesIO(b"a,b\n"), length=4)
+    assert minio_store.get_df_parallel("header.csv", chunk_size=1).empty
+    minio_store.remove_object("header.csv")
+
+
+def test_put_and_iter_ndjson(minio_store, test_dict):
+    records = [dict(test_dict, i=i) for i in range(10)]
+    minio_store.put_ndjson("records.ndjson", iter(records))
+    assert list(minio_store.iter_ndjson("records.ndjson")) == records
+    minio_store.remove_object("records.ndjson")
+
+
+async def test_fget_df_chunks_and_put_upload_file(minio_store, test_dataframe):
+    with tempfile.NamedTemporaryFile() as temp:
+        test_dataframe.to_csv(temp.name, index=False)
+        upload_file = UploadFile(temp, filename=temp.name)
+        chunks = list(minio_store.fget_df_chunks(upload_file, chunksize=30))
+        assert [chunk.shape[0] for chunk in chunks] == [30, 30, 30, 10]
+        await upload_file.seek(0)
+        minio_store.put_upload_file("upload.csv", upload_file)
+    df = minio_store.get_df("upload.csv")
+    assert df.shape == test_dataframe.shape
+    minio_store.remove_object("upload.csv")
+
+
+def test_listing_index(minio_store, test_dict):
+    minio_store.listing_index = ListingIndex()
+    minio_store.put_as_json("indexed/0.json", test_dict)
+    assert minio_store.list_objects("indexed/", recursive=True) == ["indexed/0.json"]
+    minio_store.put_as_json("indexed/1.json", test_dict)
+    assert minio_store.listing_index.query("indexed/") == [
+        "indexed/0.json",
+        "indexed/1.json",
+    ]
+    minio_store.remove_dir("indexed/")
+    assert minio_store.list_objects("indexed/", recursive=True) == []
+
+
+def test_put_deduplicated(minio_store, test_string):
+    key = minio_store.put_deduplicated("dedup/a.txt", BytesIO(test_string))
+    assert minio_store.exists(key)
+    assert minio_store.put_deduplicated("dedup/b.txt", BytesIO(test_string)) == key
+    begotten = minio_store.get("dedup/b.txt")
+    assert begotten.read() == test_string
+    begotten.release_conn()
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(test_string)
+        file.flush()
+        assert minio_store.fput_deduplicated("dedup/c.txt", file.name) == [key]
+    assert minio_store.exists("dedup/c.txt")
+    with tempfile.TemporaryDirectory() as folder:
+        for file_name in ["d.txt", ".e.txt"]:
+            with open(os.path.join(folder, file_name), "wb") as f:
+                f.write(test_string)
+        assert minio_store.fput_deduplicated("dedup/dir", folder) == [key]
+    assert minio_store.list_objects("dedup/dir/") == ["dedup/dir/d.txt"]
+    minio_store.remove_dir("dedup")
+    minio_store.remove_object(key)
+
+
+def test_buffered_writer(minio_store, test_dict):
+    with BufferedWriter(minio_store, "buffered/", max_records=4) as writer:
+        for i in range(10):
+            writer.write(dict(test_dict, i=i))
+    names = minio_store.list_objects("buffered/", recursive=True)
+    assert len(names) == 3
+    records = [record for name in names for record in minio_store.iter_ndjson(name)]
+    assert sorted(record["i"] for record in records) == list(range(10))
+    minio_store.remove_dir("buffered")
+
+
+def test_buffered_writer_retries_failed_upload(minio_store, test_dict, monkeypatch):
+    def put(*args, **kwargs):
+        raise ConnectionError("unavailable")
+
+    writer = BufferedWriter(minio_store, "buffered/")
+    monkeypatch.setattr(minio_store, "put", put)
+    writer.write(test_dict)
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    with pytest.raises(ConnectionError):
+        writer.write(test_dict)
+    monkeypatch.undo()
+    writer.close()
+    names = minio_store.list_objects("buffered/", recursive=True)
+    assert list(minio_store.iter_ndjson(names[0])) == [test_dict]
+    minio_store.remove_dir("buffered")
+
+
+def test_prefetch_iter(minio_store, test_dict):
+    names = [f"prefetch/{i}.json" for i in range(5)]
+    for i, name in enumerate(names):
+        minio_store.put_as_json(name, dict(test_dict, i=i))
+    results = list(
+        minio_store.prefetch_iter(names, depth=2, loader=minio_store.get_json)
+    )
+    assert [result["i"] for result in results] == list(range(5))
+    contents = list(minio_store.prefetch_iter(names, max_bytes=1))
+    assert [json.loads(content)["i"] for content in contents] == list(range(5))
+    minio_store.remove_dir("prefetch")
+
+
+def test_verify_checksum(minio_store, test_dataframe, test_dict):
+    minio_store.verify_checksum = True
+    minio_store.put_as_json("verified.json", test_dict)
+    assert minio_store.get_json("verified.json") == test_dict
+    assert list(minio_store.iter_ndjson("verified.json")) == [test_dict]
+    minio_store.upload_df("verified.csv", test_dataframe)
+    assert minio_store.get_df("verified.csv").shape == test_dataframe.shape
+    minio_store.download("verified.csv", "verified.csv")
+    assert os.path.getsize("verified.csv") == minio_store.get_size("verified.csv")
+    os.remove("verified.csv")
+    minio_store.remove_objects(["verified.json", "verified.csv"])
+
+
+def test_pickle_and_process_map(minio_store, test_dict):
+    store = pickle.loads(pickle.dumps(minio_store))
+    assert store.bucket == minio_store.bucket
+    assert store.client is not minio_store.client
+    names = [f"process_map/{i}.json" for i in range(4)]
+    for i, name in enumerate(names):
+        store.put_as_json(name, dict(test_dict, i=i))
+    assert minio_store.process_map(_get_i, names, max_workers=2) == list(range(4))
+    minio_store.remove_dir("process_map")
+
+
+def test_get_df_compact(minio_store, test_dataframe):
+    minio_store.upload_df("compact.csv", test_dataframe, schema=True)
+    assert minio_store.exists("compact.csv.schema.json")
+    df = minio_store.get_df("compact.csv", date_columns=["column_4_date"], compact=True)
+    assert df.shape == test_dataframe.shape
+    assert df["column_0_cat"].dtype == "category"
+    assert df.memory_usage(deep=True).sum() < (
+        test_dataframe.memory_usage(deep=True).sum()
+    )
+    minio_store.put("compact.csv", BytesIO(b"column_1_int\n300000\n"), length=20)
+    df = minio_store.get_df("compact.csv", compact=True)
+    assert df["column_1_int"].tolist() == [300000]
+    minio_store.upload_df("compact.csv", test_dataframe, schema=True)
+    minio_store.upload_df("compact.csv", pd.DataFrame({"column_1_int": [300000]}))
+    df = minio_store.get_df("compact.csv", compact=True)
+    assert df["column_1_int"].tolist() == [300000]
+    minio_store.remove_objects(["compact.csv", "compact.csv.schema.json"])
@@ -0,0 +1,35 @@
+import time
+from io import BytesIO
+
+from awesome_object_store import RateLimiter, get_rate_limiters, set_rate_limit
+from awesome_object_store.rate_limit import ThrottledStream, remove_rate_limit
+
+
+def test_rate_limiter_waits_for_debt():
+    limiter = RateLimiter(bytes_per_second=1000, requests_per_second=100)
+    start = time.monotonic()
+    limiter.acquire(nbytes=1000)
+    limiter.acquire(nbytes=100)
+    assert time.monotonic() - start >= 0.09
+    utilization = limiter.utilization()
+    assert 0 < utilization["bytes"] <= 1
+    assert 0 < utilization["requests"] <= 1
+
+
+def test_rate_limit_registry():
+    set_rate_limit("localhost:9000", requests_per_second=10)
+    set_rate_limit("localhost:9000/bucket", bytes_per_second=10)
+    assert len(get_rate_limiters("localhost:9000", "bucket")) == 2
+    assert len(get_rate_limiters("localhost:9000", "other")) == 1
+    remove_rate_limit("localhost:9000")
+    remove_rate_limit("localhost:9000/bucket")
+    assert get_rate_limiters("localhost:9000", "bucket") == []
+
+
+def test_throttled_stream():
+    charged = []
+    stream = ThrottledStream(BytesIO(b"abcdef"), charged.append)
+    assert stream.read(4) == b"abcd"
+    assert stream.read() == b"ef"
+    assert stream.tell() == 6
+    assert sum(charged) == 6
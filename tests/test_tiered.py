@@ -0,0 +1,60 @@
+import pytest
+
+from awesome_object_store import WRITE_BACK, TieredObjectStore, TierPolicy
+from awesome_object_store.minio import MinioStore
+
+
+@pytest.fixture
+def slow_store(settings):
+    return MinioStore(
+        host=settings.minio_host,
+        bucket=f"{settings.minio_bucket}-slow",
+        access_key=settings.minio_access_key,
+        secret_key=settings.minio_secret_key,
+        secure=settings.minio_secure,
+        region=settings.minio_region,
+    )
+
+
+@pytest.fixture
+def tiered_store(minio_store, slow_store):
+    return TieredObjectStore(
+        minio_store,
+        slow_store,
+        policies={
+            "scratch/": TierPolicy(WRITE_BACK),
+            "cold/": TierPolicy(promote=False),
+        },
+    )
+
+
+def test_write_through_and_promotion(tiered_store, minio_store, slow_store, test_dict):
+    tiered_store.put_as_json("tiered/a.json", test_dict)
+    assert minio_store.exists("tiered/a.json")
+    assert slow_store.exists("tiered/a.json")
+
+    slow_store.put_as_json("tiered/b.json", test_dict)
+    assert tiered_store.get_json("tiered/b.json") == test_dict
+    assert minio_store.exists("tiered/b.json")
+
+    tiered_store.remove_dir("tiered/")
+    assert tiered_store.exists("tiered/a.json") is False
+    assert minio_store.exists("tiered/b.json") is False
+
+
+def test_write_back(tiered_store, minio_store, slow_store, test_dict):
+    with tiered_store:
+        tiered_store.put_as_json("scratch/a.json", test_dict)
+        assert slow_store.exists("scratch/a.json") is False
+        assert tiered_store.list_objects("scratch/") == ["scratch/a.json"]
+    assert slow_store.exists("scratch/a.json")
+    tiered_store.remove_object("scratch/a.json")
+    assert minio_store.exists("scratch/a.json") is False
+
+
+def test_write_back_copy_of_slow_source(tiered_store, slow_store, test_dict):
+    slow_store.put_as_json("cold/a.json", test_dict)
+    tiered_store.copy_object("cold/a.json", "scratch/b.json")
+    tiered_store.flush()
+    assert slow_store.get_json("scratch/b.json") == test_dict
+    tiered_store.remove_objects(["cold/a.json", "scratch/b.json"])
@@ -0,0 +1,85 @@
+import hashlib
+import math
+import mmap
+import tempfile
+import uuid
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from awesome_object_store.utils import (
+    ChecksumMismatchError,
+    ChecksumStream,
+    IterStream,
+    MmapReader,
+    compact_df,
+    compact_dtypes,
+    json_dumps,
+    json_loads,
+)
+
+
+def test_json_round_trip(test_dict):
+    assert json_loads(json_dumps(test_dict)) == test_dict
+    assert json_loads(json_dumps({1: "a"})) == {"1": "a"}
+    data = json_loads(json_dumps({"nan": float("nan"), "inf": [float("inf")]}))
+    assert math.isnan(data["nan"]) and data["inf"] == [float("inf")]
+    assert json_loads(b'{"a": NaN}').keys() == {"a"}
+    big = [2**64, -(2**63) - 1, 2**64 - 1]
+    assert json_loads(json_dumps(big)) == big
+    assert json_loads(str(2**70)) == 2**70
+    for value in [datetime(2024, 1, 1), uuid.uuid4()]:
+        with pytest.raises(TypeError):
+            json_dumps({"a": value})
+
+
+def test_iter_stream():
+    stream = IterStream([b"ab", b"", b"cdef", b"g"])
+    assert stream.read(3) == b"abc"
+    assert stream.read(10) == b"defg"
+    assert stream.read(10) == b""
+    assert stream.tell() == 7
+
+
+def test_mmap_reader(test_dataframe):
+    with tempfile.TemporaryFile() as file:
+        test_dataframe.to_csv(file, index=False)
+        file.flush()
+        reader = MmapReader(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    df = pd.read_csv(reader, parse_dates=["column_4_date"])
+    assert df.shape == test_dataframe.shape
+    reader.seek(0)
+    assert bytes(reader.getbuffer()[:6]) == reader.read(6)
+    reader.close()
+    assert reader.closed
+
+
+def test_compact_df(test_dataframe):
+    dtypes = compact_dtypes(test_dataframe)
+    assert dtypes["column_0_cat"] == "category"
+    assert dtypes["column_1_int"] == "uint8"
+    assert "column_4_date" not in dtypes
+    assert compact_dtypes(pd.DataFrame({"f": [0.5, -1.0]})) == {"f": "float32"}
+    assert compact_dtypes(pd.DataFrame({"f": [0.1, 123456.789]})) == {}
+    df = compact_df(test_dataframe, exclude=["column_2_cat"])
+    assert df["column_2_cat"].dtype == object
+    assert df.memory_usage(deep=True).sum() < (
+        test_dataframe.memory_usage(deep=True).sum()
+    )
+    assert (df["column_1_int"] == test_dataframe["column_1_int"]).all()
+
+
+def test_checksum_stream(test_string):
+    stream = ChecksumStream(BytesIO(test_string), part_size=10)
+    assert stream.read() == test_string
+    assert stream.matches(f'"{hashlib.md5(test_string).hexdigest()}"')
+    parts = [test_string[i : i + 10] for i in range(0, len(test_string), 10)]
+    multipart = hashlib.md5(b"".join(hashlib.md5(p).digest() for p in parts))
+    assert stream.matches(f"{multipart.hexdigest()}-{len(parts)}")
+    assert not stream.matches(f"{multipart.hexdigest()}-1")
+    etag = hashlib.md5(test_string).hexdigest()
+    assert ChecksumStream(BytesIO(test_string), etag=etag).read() == test_string
+    with pytest.raises(ChecksumMismatchError):
+        ChecksumStream(BytesIO(test_string + b"!"), etag=etag).read()